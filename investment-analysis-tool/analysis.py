@@ -1,43 +1,238 @@
+import os
+import re
+import hashlib
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
 import pandas as pd
 import numpy as np
-from datetime import datetime
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+_FACTORS = {
+    "Growth/Tech": ["NVDA", "QQQ", "ARKK", "SOFI", "HOOD", "NET", "ZETA", "ONTO", "AMZN", "GOOG", "MSFT", "AAPL", "TSM", "NBIS", "OSCR", "PYPL", "JD", "BABA", "BIDU", "REGN"],
+    "Market/Core": ["VOO", "SPY", "BRKB", "VUG", "VTI", "VXUS", "ALLW"],
+    "Income/Yield": ["JEPI", "JEPQ", "TLT", "EPD", "ET", "MPLX", "DKL", "PALL"],
+    "Defensive": ["COST", "UPS", "UNH"],
+    "Cash/Equivalents": ["SPAXX", "FDRXX"]
+}
+
+# Reverse index so classifying a holding is a single dict lookup; ids index _FACTOR_NAMES (0 = Unclassified)
+_FACTOR_NAMES = ["Unclassified", *_FACTORS]
+_SYMBOL_TO_FACTOR_ID = {symbol: factor_id for factor_id, symbols in enumerate(_FACTORS.values(), 1) for symbol in symbols}
+
+# Sweep/money-market symbols left out of concentration alerts
+_CASH_SYMBOLS = ["SPAXX", "FDRXX"]
+
+# Formatting characters stripped from Fidelity numeric cells ("$1,234.56", "12.3%")
+_NUMERIC_JUNK = re.compile(r'[,\$\%]')
+
+# Arrow-backed strings run str.replace/to_numeric in Arrow's C++ kernels instead of per-cell Python
+try:
+    import pyarrow # noqa: F401
+    _STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    _STRING_DTYPE = 'string'
+
+# Translation table deleting "$" and "," from money strings without the regex engine
+_MONEY_JUNK = str.maketrans('', '', '$,')
+
+# Parsed CSVs are cached here between runs (see _load_cached). Bump _CACHE_VERSION whenever a parser's
+# output changes so frames written by older code are never served.
+_CACHE_DIR = Path.home() / '.cache' / 'investment-analyzer'
+_CACHE_VERSION = 2
+
+# The cache is parquet, so it is skipped entirely when neither parquet engine is installed
+try:
+    import pyarrow.parquet # noqa: F401
+    _CACHE_ENABLED = True
+except ImportError:
+    try:
+        import fastparquet # noqa: F401
+        _CACHE_ENABLED = True
+    except ImportError:
+        _CACHE_ENABLED = False
+
+# read_csv options the pyarrow engine does not support
+_C_PARSER_ONLY = ('converters', 'chunksize')
+
+# Fidelity exports US dates ("10/28/2024"); Robinhood/Plaid use ISO-8601 timestamps
+_US_DATE_FORMAT = '%m/%d/%Y'
+_ISO_DATE = re.compile(r'^\d{4}-')
+
+# Rows per chunk when streaming large history exports
+_HISTORY_CHUNK_ROWS = 200_000
+
+# Only these columns are ever read downstream; everything else is skipped at parse time
+_HISTORY_COLUMNS = {'Run Date', 'Action', 'Symbol', 'Quantity', 'Price', 'Currency', 'Amount'}
+_POSITIONS_COLUMNS = {
+    'Account Number', 'Symbol', 'Quantity', 'Last Price', 'Current Value', 'Total Gain/Loss Dollar',
+    'Percent Of Account', 'Total Gain/Loss Percent', "Today's Gain/Loss Percent", 'Investment Type'
+}
+
+
+def _read_csv(source, **kwargs):
+    # Prefer the multithreaded Arrow reader; fall back to the C parser when pyarrow
+    # isn't installed or rejects the file (e.g. Fidelity's free-text footer rows).
+    # source may be a path or an open file-like (e.g. an upload stream).
+    if not any(option in kwargs for option in _C_PARSER_ONLY) and not callable(kwargs.get('usecols')):
+        start = source.tell() if hasattr(source, 'seek') else None
+        try:
+            return pd.read_csv(source, engine='pyarrow', **kwargs)
+        except (ImportError, ValueError):
+            if start is not None:
+                source.seek(start) # pyarrow may have consumed part of the stream
+    return pd.read_csv(source, **kwargs)
+
+
+def _net_by_symbol(symbols, signed_qty):
+    # Per-symbol running total as one compiled loop over integer symbol codes.
+    # Index keeps first-appearance order; missing symbols are dropped.
+    codes, uniques = pd.factorize(symbols)
+    known = codes >= 0
+    totals = np.bincount(codes[known], weights=np.asarray(signed_qty, dtype=np.float64)[known], minlength=len(uniques))
+    return pd.Series(totals, index=uniques)
+
+
+def _load_cached(filepath, tag, parse):
+    # Parsed frames are kept as parquet, keyed by the file's path, mtime and size plus the parser
+    # (_CACHE_VERSION) and pandas versions. Any cache problem (no parquet engine, unwritable dir, ...)
+    # just means parsing again. Streams have nothing stable to key on, so they are always parsed.
+    if not _CACHE_ENABLED:
+        return parse()
+    cache_file = None
+    try:
+        stat = os.stat(filepath)
+        path_key = hashlib.md5(os.path.abspath(filepath).encode()).hexdigest()
+        stamp_key = hashlib.md5(f"{stat.st_mtime_ns}|{stat.st_size}|{_CACHE_VERSION}|{pd.__version__}".encode()).hexdigest()
+        cache_file = _CACHE_DIR / f"{tag}-{path_key}-{stamp_key}.parquet"
+        if cache_file.exists():
+            return pd.read_parquet(cache_file)
+    except Exception:
+        cache_file = None
+
+    df = parse()
+
+    if cache_file is not None:
+        tmp_file = None
+        try:
+            # The cache holds full brokerage history, so keep it private to the user
+            _CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(_CACHE_DIR, 0o700)
+            # Unique (0600) temp file per writer, so concurrent processes never share one
+            with tempfile.NamedTemporaryFile(dir=_CACHE_DIR, suffix='.tmp', delete=False) as tmp:
+                tmp_file = tmp.name
+            df.to_parquet(tmp_file)
+            os.replace(tmp_file, cache_file)
+            tmp_file = None
+            # Entries for older versions of the same file are never read again
+            for stale in _CACHE_DIR.glob(f"{tag}-{path_key}-*.parquet"):
+                if stale != cache_file:
+                    stale.unlink()
+        except Exception:
+            if tmp_file is not None:
+                Path(tmp_file).unlink(missing_ok=True)
+    return df
+
+
+def _to_number(column):
+    # "$1,234.56" / "12.3%" -> float64 in one strip-and-convert walk; unparseable cells become NaN.
+    # Columns the reader already typed as numbers are passed through without a string round-trip.
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(np.float64, na_value=np.nan)
+    text = column.astype(_STRING_DTYPE).str.replace(_NUMERIC_JUNK.pattern, '', regex=True)
+    return pd.to_numeric(text, errors='coerce').to_numpy(np.float64, na_value=np.nan)
+
+
+def _to_dates(column, errors='coerce'):
+    # Parse with an explicit format sniffed from the first value instead of per-cell inference;
+    # cache=True lets the many repeated trade dates share one conversion.
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    # Fidelity pads its fields (" 10/28/2024"), which an explicit format would reject
+    if pd.api.types.infer_dtype(column, skipna=True) == 'string':
+        column = column.str.strip()
+    first = column.dropna().head(1).astype(str)
+    fmt = 'ISO8601' if not first.empty and _ISO_DATE.match(first.iloc[0]) else _US_DATE_FORMAT
+    try:
+        dates = pd.to_datetime(column, format=fmt, cache=True, errors=errors)
+    except ValueError:
+        dates = None
+    # An unexpected format falls back to per-cell inference rather than wiping every row
+    if dates is None or (dates.isna().all() and column.notna().any()):
+        dates = pd.to_datetime(column, cache=True, errors=errors)
+    return dates
+
+
+def _sort_by_date(df):
+    # Exports usually arrive already in date order, so check first (O(n)) and only sort when needed.
+    # Stable mergesort keeps same-day rows in file order; the old index is not needed downstream.
+    if df['Date'].is_monotonic_increasing:
+        return df
+    return df.sort_values('Date', kind='mergesort', ignore_index=True)
+
+
+def _replay_orders(sym_ids, sides, qtys, pxs, n_syms):
+    # Sequential buy/sell replay over parallel arrays (symbol id, +1/-1 side, quantity, price).
+    # A position sold down to ~0 is closed, so a later buy starts from scratch.
+    held = np.zeros(n_syms)
+    last_px = np.zeros(n_syms)
+    for s, side, q, px in zip(sym_ids, sides, qtys, pxs):
+        if s < 0:
+            continue
+        if side > 0:
+            held[s] += q
+        elif side < 0:
+            held[s] -= q
+            if held[s] <= 0.0001: # Float tolerance
+                held[s] = 0.0
+        last_px[s] = px
+    return held, last_px
+
+
+if njit is not None:
+    _replay_orders = njit(cache=True)(_replay_orders)
+else:
+    _replay_kernel = _replay_orders
+
+    def _replay_orders(sym_ids, sides, qtys, pxs, n_syms):
+        # Without numba, loop over native ints/floats instead of boxing a numpy scalar per element
+        return _replay_kernel(sym_ids.tolist(), sides.tolist(), qtys.tolist(), pxs.tolist(), n_syms)
+
+
+def _parse_money(text):
+    # CSV converter: "$1,234.56" -> 1234.56; blanks and footer text become NaN
+    text = text.translate(_MONEY_JUNK).strip()
+    try:
+        return float(text) if text else np.nan
+    except ValueError:
+        return np.nan
+
 
 class PortfolioAnalyzer:
-    def __init__(self, history_filepath, positions_filepath=None):
-        self.history_filepath = history_filepath
+    def __init__(self, history_filepath, positions_filepath=None, max_history_rows=None):
+        self.history_filepath = history_filepath # Path or open file-like (e.g. an upload stream)
         self.positions_filepath = positions_filepath
+        self.max_history_rows = max_history_rows # Optional cap on history rows read (most recent first)
         self.history_df = None
         self.positions_df = None
-        self.holdings = {} # Symbol -> Quantity
+        self.holdings = pd.Series(dtype=np.float64) # Symbol -> Quantity
         self.holdings_data = {} # Symbol -> Full Data Row
         self.cash_balance = 0.0
         self.performance = {}
+        self._exposure_cache = None # get_factor_exposure result, cleared whenever holdings change
+        self._allocation_cache = None # get_asset_allocation result, cleared alongside it
+        self._holdings_view = None # Per-holding parallel arrays, built once per holdings snapshot
 
     def load_data(self):
         # Load History
         try:
-            self.history_df = pd.read_csv(self.history_filepath)
-            self.history_df.columns = [c.strip() for c in self.history_df.columns]
-            
-            # Fix misaligned columns in history if needed
-            if 'Quantity' in self.history_df.columns and self.history_df['Quantity'].astype(str).str.contains('USD').any():
-                # print("Detected misaligned columns in history. Adjusting...")
-                self.history_df = self.history_df.rename(columns={
-                    'Quantity': 'CurrencyCode',
-                    'Currency': 'RealPrice',
-                    'Price': 'RealQuantity'
-                })
-                self.history_df['Quantity'] = self.history_df['RealQuantity']
-                self.history_df['Price'] = self.history_df['RealPrice']
-
-            self.history_df['Run Date'] = pd.to_datetime(self.history_df['Run Date'], errors='coerce')
-            self.history_df = self.history_df.dropna(subset=['Run Date'])
-            self.history_df['Date'] = self.history_df['Run Date']
-            
-            if 'Amount' in self.history_df.columns:
-                self.history_df['Amount'] = self.history_df['Amount'].replace(r'[\$,]', '', regex=True).astype(float)
-                
-            self.history_df = self.history_df.sort_values('Date')
+            history_tag = 'history' if self.max_history_rows is None else f'history{self.max_history_rows}'
+            self.history_df = _load_cached(self.history_filepath, history_tag, self._parse_history)
+            self._normalize_actions()
         except Exception as e:
             print(f"Error loading history data: {e}")
             return False
@@ -45,31 +240,90 @@ class PortfolioAnalyzer:
         # Load Positions if provided
         if self.positions_filepath:
             try:
-                self.positions_df = pd.read_csv(self.positions_filepath)
-                self.positions_df.columns = [c.strip() for c in self.positions_df.columns]
-                
-                # Clean up positions data
-                # Remove footer rows (where Account Number is NaN or empty)
-                self.positions_df = self.positions_df.dropna(subset=['Account Number'])
-                
-                # Convert numeric columns
-                cols_to_clean = ['Quantity', 'Last Price', 'Current Value', 'Total Gain/Loss Dollar', 'Percent Of Account', 'Total Gain/Loss Percent', "Today's Gain/Loss Percent"]
-                for col in cols_to_clean:
-                    if col in self.positions_df.columns:
-                        self.positions_df[col] = self.positions_df[col].astype(str).str.replace(r'[,\$\%]', '', regex=True)
-                        self.positions_df[col] = pd.to_numeric(self.positions_df[col], errors='coerce').fillna(0)
-                        
+                self.positions_df = _load_cached(self.positions_filepath, 'positions', self._parse_positions)
             except Exception as e:
                 print(f"Error loading positions data: {e}")
                 # We can continue without positions, just falling back to history
-        
+
+        # Values and allocation depend on positions_df, so drop anything derived from a previous load
+        self._holdings_changed()
         return True
+
+    def _parse_history(self):
+        # Stream the export in chunks so memory stays bounded by the chunk size plus the kept rows.
+        # Amount is parsed to float by the reader itself; headers may carry stray whitespace.
+        chunks = []
+        row_count = 0
+        misaligned = None
+        with _read_csv(
+            self.history_filepath,
+            usecols=lambda c: c.strip() in _HISTORY_COLUMNS,
+            dtype={'Symbol': 'string', 'Action': 'string'},
+            converters={'Amount': _parse_money},
+            chunksize=_HISTORY_CHUNK_ROWS
+        ) as reader:
+            for chunk in reader:
+                chunk.columns = [c.strip() for c in chunk.columns]
+
+                # Fix misaligned columns in history if needed
+                # The shift comes from the header, so it already shows up in the first rows
+                if misaligned is None:
+                    misaligned = 'Quantity' in chunk.columns and chunk['Quantity'].head(32).astype(_STRING_DTYPE).str.contains('USD', regex=False, na=False).any()
+                if misaligned:
+                    chunk = chunk.rename(columns={
+                        'Quantity': 'CurrencyCode',
+                        'Currency': 'RealPrice',
+                        'Price': 'RealQuantity'
+                    })
+                    chunk['Quantity'] = chunk['RealQuantity']
+                    chunk['Price'] = chunk['RealPrice']
+
+                chunk['Run Date'] = _to_dates(chunk['Run Date'])
+                # Footer rows have no date; drop them in place rather than copying the surviving rows
+                valid_dates = chunk['Run Date'].notna()
+                if not valid_dates.all():
+                    chunk.drop(index=chunk.index[~valid_dates], inplace=True)
+
+                chunks.append(chunk)
+                row_count += len(chunk)
+                # Fidelity lists newest activity first, so a row cap keeps the most recent history
+                if self.max_history_rows is not None and row_count >= self.max_history_rows:
+                    break
+
+        self.history_df = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+        if self.max_history_rows is not None:
+            self.history_df = self.history_df.head(self.max_history_rows)
+        self.history_df['Date'] = self.history_df['Run Date']
+
+        # Only needed if the header didn't match the converter key exactly (e.g. padded with spaces)
+        if 'Amount' in self.history_df.columns and not pd.api.types.is_numeric_dtype(self.history_df['Amount']):
+            self.history_df['Amount'] = self.history_df['Amount'].astype(str).str.translate(_MONEY_JUNK).astype(float)
+
+        self.history_df = _sort_by_date(self.history_df)
+        return self.history_df
+
+    def _parse_positions(self):
+        self.positions_df = _read_csv(self.positions_filepath, usecols=lambda c: c.strip() in _POSITIONS_COLUMNS)
+        self.positions_df.columns = [c.strip() for c in self.positions_df.columns]
+
+        # Clean up positions data
+        # Remove footer rows (where Account Number is NaN or empty)
+        self.positions_df = self.positions_df.dropna(subset=['Account Number'])
+
+        # Convert numeric columns
+        cols_to_clean = ['Quantity', 'Last Price', 'Current Value', 'Total Gain/Loss Dollar', 'Percent Of Account', 'Total Gain/Loss Percent', "Today's Gain/Loss Percent"]
+        cols_to_clean = [col for col in cols_to_clean if col in self.positions_df.columns]
+        if cols_to_clean:
+            cleaned = {col: _to_number(self.positions_df[col]) for col in cols_to_clean}
+            self.positions_df[cols_to_clean] = pd.DataFrame(cleaned, index=self.positions_df.index).fillna(0)
+        return self.positions_df
+
     def load_robinhood_data(self):
         try:
             # Robinhood CSVs usually have: provider_id, period, begin_execution_date, end_execution_date, settlement_date, id, instrument_url, symbol, side, quantity, price, state, type, trigger, price_arg, stop_price, fees, amount
             # Or simpler: symbol, name, price, quantity, etc. depending on export type.
             # We'll assume "orders" export.
-            self.history_df = pd.read_csv(self.history_filepath)
+            self.history_df = _read_csv(self.history_filepath)
             self.history_df.columns = [c.strip().lower().replace(' ', '_') for c in self.history_df.columns]
             
             # Normalize columns
@@ -81,50 +335,58 @@ class PortfolioAnalyzer:
                 
                 # Sort by date
                 if 'date' in self.history_df.columns:
-                    self.history_df['Date'] = pd.to_datetime(self.history_df['date'])
+                    self.history_df['Date'] = _to_dates(self.history_df['date'], errors='raise')
                 elif 'updated_at' in self.history_df.columns:
-                    self.history_df['Date'] = pd.to_datetime(self.history_df['updated_at'])
+                    self.history_df['Date'] = _to_dates(self.history_df['updated_at'], errors='raise')
                 else:
-                    # Fallback
-                    self.history_df['Date'] = datetime.now()
+                    # Fallback: one Timestamp broadcast to every row (a constant column is already "sorted")
+                    self.history_df['Date'] = pd.Timestamp.now()
                 
-                self.history_df = self.history_df.sort_values('Date')
+                self.history_df = _sort_by_date(self.history_df)
                 
                 # Reconstruct holdings
-                self.holdings = {}
-                self.holdings_data = {}
-                
-                for _, row in self.history_df.iterrows():
-                    symbol = str(row.get('symbol', '')).upper()
-                    side = str(row.get('side', '')).lower()
-                    qty = float(row.get('quantity', 0))
-                    price = float(row.get('average_price', row.get('price', 0)))
-                    
-                    if side == 'buy':
-                        self.holdings[symbol] = self.holdings.get(symbol, 0) + qty
-                    elif side == 'sell':
-                        self.holdings[symbol] = self.holdings.get(symbol, 0) - qty
-                        if self.holdings[symbol] <= 0.0001: # Float tolerance
-                             if symbol in self.holdings: del self.holdings[symbol]
-                    
-                    # Update "Current Value" estimate using last transaction price (imperfect but functional for history-only)
-                    if symbol in self.holdings:
-                        current_qty = self.holdings[symbol]
-                        # Mock current value based on last known price
-                        self.holdings_data[symbol] = {
-                            'Current Value': current_qty * price,
-                            'Total Gain/Loss Percent': 0.0, # Cannot calculate without live price
-                            'Investment Type': 'Stocks' # Default
-                        }
-                
+                df = self.history_df
+                symbol = df['symbol'].astype(str).str.upper()
+                side = df['side'].astype(str).str.lower()
+                qty = pd.to_numeric(df['quantity'], errors='coerce').fillna(0) if 'quantity' in df.columns else pd.Series(0.0, index=df.index)
+                price = pd.Series(np.nan, index=df.index)
+                for col in ('average_price', 'price'):
+                    if col in df.columns:
+                        price = price.fillna(pd.to_numeric(df[col], errors='coerce'))
+                price = price.fillna(0)
+
+                sides = np.where(side == 'buy', 1, np.where(side == 'sell', -1, 0)).astype(np.int8)
+                sym_ids, symbols = pd.factorize(symbol)
+
+                # Replay fills in date order to get the open quantity and last traded price per symbol
+                held, last_px = _replay_orders(
+                    sym_ids.astype(np.int32), sides, qty.to_numpy(np.float64), price.to_numpy(np.float64), len(symbols)
+                )
+
                 # Clean up small residuals
-                self.holdings = {k: v for k, v in self.holdings.items() if v > 0.001}
+                open_positions = held > 0.001
+                holdings = pd.Series(held[open_positions], index=symbols[open_positions])
+
+                # Estimate "Current Value" from the last transaction price (imperfect but functional for history-only)
+                current_value = holdings * last_px[open_positions]
+
+                self.holdings = holdings
+                self.holdings_data = {
+                    symbol: {
+                        'Current Value': value,
+                        'Total Gain/Loss Percent': 0.0, # Cannot calculate without live price
+                        'Investment Type': 'Stocks' # Default
+                    }
+                    for symbol, value in current_value.items()
+                }
+                self._holdings_changed()
                 
                 # Set positions_df to mock structure for other methods
-                self.positions_df = pd.DataFrame([
-                    {'Symbol': k, 'Current Value': self.holdings_data[k]['Current Value'], 'Investment Type': 'Stocks'}
-                    for k in self.holdings
-                ])
+                self.positions_df = pd.DataFrame({
+                    'Symbol': current_value.index.to_numpy(),
+                    'Current Value': current_value.to_numpy(np.float64),
+                    'Investment Type': np.full(len(current_value), 'Stocks', dtype=object)
+                })
                 
                 return True
             else:
@@ -138,8 +400,9 @@ class PortfolioAnalyzer:
     def load_plaid_data(self, holdings_response, transactions_response):
         try:
             # Process Holdings
-            self.holdings = {}
+            holdings = {}
             self.holdings_data = {}
+            self._holdings_changed()
             
             securities = {s['security_id']: s for s in holdings_response.get('securities', [])}
             
@@ -162,18 +425,22 @@ class PortfolioAnalyzer:
                     if total_cost > 0:
                         gain_loss_pct = ((value - total_cost) / total_cost) * 100
                 
-                self.holdings[symbol] = qty
+                holdings[symbol] = qty
                 self.holdings_data[symbol] = {
                     'Current Value': value,
                     'Investment Type': security.get('type', 'Unknown'),
                     'Total Gain/Loss Percent': gain_loss_pct
                 }
             
-            # Create positions_df
-            self.positions_df = pd.DataFrame([
-                {'Symbol': k, 'Current Value': self.holdings_data[k]['Current Value'], 'Investment Type': self.holdings_data[k]['Investment Type']}
-                for k in self.holdings
-            ])
+            self.holdings = pd.Series(holdings, dtype=np.float64)
+            
+            # Create positions_df column by column (same layout as the Robinhood mock)
+            symbols = list(holdings)
+            self.positions_df = pd.DataFrame({
+                'Symbol': np.array(symbols, dtype=object),
+                'Current Value': np.fromiter((self.holdings_data[k]['Current Value'] for k in symbols), dtype=np.float64, count=len(symbols)),
+                'Investment Type': np.array([self.holdings_data[k]['Investment Type'] for k in symbols], dtype=object)
+            })
             
             # Process Transactions for History
             history_records = []
@@ -185,7 +452,7 @@ class PortfolioAnalyzer:
                 name = t['name']
                 
                 history_records.append({
-                    'Date': pd.to_datetime(date),
+                    'Date': date,
                     'Action': name, # Placeholder
                     'Amount': amount,
                     'Symbol': '', # Plaid transactions might not link directly to symbols easily without more processing
@@ -194,9 +461,11 @@ class PortfolioAnalyzer:
                 
             if history_records:
                 self.history_df = pd.DataFrame(history_records)
-                self.history_df = self.history_df.sort_values('Date')
+                self.history_df['Date'] = _to_dates(self.history_df['Date'], errors='raise')
+                self.history_df = _sort_by_date(self.history_df)
             else:
                 self.history_df = pd.DataFrame(columns=['Date', 'Action', 'Amount', 'Symbol', 'Quantity'])
+            self._normalize_actions()
                 
             return True
             
@@ -204,57 +473,60 @@ class PortfolioAnalyzer:
             print(f"Error loading Plaid data: {e}")
             return False
 
+    def _normalize_actions(self):
+        # Uppercase 'Action' once and store it as a categorical, so each distinct action is kept once
+        self.history_df['_ActionU'] = self.history_df['Action'].astype('string').str.upper().astype('category')
+
+    def _action_mask(self, *keywords):
+        # Substring tests run once per distinct action, then broadcast to rows through the category codes
+        actions = self.history_df['_ActionU']
+        categories = actions.cat.categories.astype(str)
+        hits = np.zeros(len(categories) + 1, dtype=bool) # Trailing slot catches code -1 (missing action)
+        for keyword in keywords:
+            hits[:-1] |= np.asarray(categories.str.contains(keyword, regex=False), dtype=bool)
+        return pd.Series(hits[actions.cat.codes.to_numpy()], index=actions.index)
+
     def calculate_holdings(self):
         if self.positions_df is not None:
             # Use the accurate positions file
             # If holdings were already calculated (e.g. by load_robinhood_data), skip
-            if not self.holdings:
-                self.holdings = {}
-                self.holdings_data = {}
-                for _, row in self.positions_df.iterrows():
-                    symbol = str(row.get('Symbol', ''))
-                    if not symbol or symbol == 'nan' or 'Pending activity' in symbol: 
-                        continue
-                    
-                    # Clean symbol (remove ** or similar artifacts)
-                    symbol = symbol.replace('*', '')
-                    
-                    qty = row.get('Quantity', 0)
-                    self.holdings[symbol] = qty
-                    self.holdings_data[symbol] = row.to_dict()
+            if self.holdings.empty:
+                positions = self.positions_df[self.positions_df['Symbol'].notna()]
+                symbols = positions['Symbol'].astype(str)
+                keep = (symbols != '') & (symbols != 'nan') & ~symbols.str.contains('Pending activity', regex=False)
+                positions = positions[keep]
+
+                # Clean symbol (remove ** or similar artifacts)
+                symbols = symbols[keep].str.replace('*', '', regex=False)
+
+                quantities = positions['Quantity'] if 'Quantity' in positions.columns else pd.Series(0, index=positions.index)
+                # Later rows win for duplicate symbols, same as row-by-row assignment
+                self.holdings = pd.Series(dict(zip(symbols, quantities)), dtype=np.float64)
+                self.holdings_data = dict(zip(symbols, positions.to_dict('records')))
+                self._holdings_changed()
         else:
             # Fallback to history reconstruction
-            current_holdings = {}
-            for _, row in self.history_df.iterrows():
-                action = str(row.get('Action', '')).upper()
-                symbol = str(row.get('Symbol', ''))
-                qty = row.get('Quantity', 0)
-                try:
-                    if isinstance(qty, str):
-                        qty = float(qty.replace(',', ''))
-                    if pd.isna(qty): 
-                        qty = 0
-                    qty = float(qty)
-                except ValueError:
-                    qty = 0
-                
-                if 'BOUGHT' in action or 'REINVESTMENT' in action:
-                    current_holdings[symbol] = current_holdings.get(symbol, 0) + qty
-                elif 'SOLD' in action:
-                    current_holdings[symbol] = current_holdings.get(symbol, 0) + qty
-                    if current_holdings[symbol] <= 0:
-                        if symbol in current_holdings: 
-                            del current_holdings[symbol]
-            
-            self.holdings = current_holdings
-            
+            df = self.history_df
+            qty = df['Quantity']
+            if not pd.api.types.is_numeric_dtype(qty):
+                qty = pd.to_numeric(qty.astype(str).str.replace(',', '', regex=False), errors='coerce')
+            qty = qty.fillna(0).astype(float)
+
+            buy = self._action_mask('BOUGHT', 'REINVESTMENT')
+            sell = self._action_mask('SOLD')
+            signed_qty = np.where(buy, qty, np.where(sell, -qty.abs(), 0.0))
+
+            current_holdings = _net_by_symbol(df['Symbol'], signed_qty)
+            self.holdings = current_holdings[current_holdings > 0]
+            self._holdings_changed()
+
         return self.holdings
 
     def analyze_performance(self):
         # Dividends from history
         dividends = 0
-        if self.history_df is not None:
-            dividends = self.history_df[self.history_df['Action'].str.contains('DIVIDEND', case=False, na=False)]['Amount'].sum()
+        if self.history_df is not None and '_ActionU' in self.history_df.columns:
+            dividends = self.history_df.loc[self._action_mask('DIVIDEND'), 'Amount'].sum()
         
         # Portfolio Value and P&L from Positions
         total_value = 0
@@ -262,9 +534,12 @@ class PortfolioAnalyzer:
         total_gain_loss_pct = 0
         
         if self.positions_df is not None:
-            total_value = self.positions_df['Current Value'].sum()
-            if 'Total Gain/Loss Dollar' in self.positions_df.columns:
-                total_gain_loss = self.positions_df['Total Gain/Loss Dollar'].sum()
+            # One reduction over both columns instead of a separate pass per column
+            sum_cols = [c for c in ('Current Value', 'Total Gain/Loss Dollar') if c in self.positions_df.columns]
+            sums = self.positions_df[sum_cols].sum()
+            total_value = sums['Current Value']
+            if 'Total Gain/Loss Dollar' in sums:
+                total_gain_loss = sums['Total Gain/Loss Dollar']
                 if total_value - total_gain_loss != 0:
                     total_gain_loss_pct = (total_gain_loss / (total_value - total_gain_loss)) * 100
         
@@ -276,7 +551,38 @@ class PortfolioAnalyzer:
             "total_gain_loss_pct": total_gain_loss_pct
         }
 
+    def _holdings_changed(self):
+        # Drop everything derived from the previous holdings
+        self._exposure_cache = None
+        self._allocation_cache = None
+        self._holdings_view = None
+
+    def _holdings_arrays(self):
+        # Structure-of-arrays view of the holdings (symbol, value, factor id, cash flag), built once;
+        # factor exposure and tweaks then run as numpy reductions instead of walking holdings_data again
+        if self._holdings_view is None:
+            symbols = self.holdings.index.to_numpy()
+            self._holdings_view = SimpleNamespace(
+                symbols=symbols,
+                values=self._holding_values(),
+                factor_ids=np.fromiter((_SYMBOL_TO_FACTOR_ID.get(s, 0) for s in symbols), dtype=np.intp, count=len(symbols)),
+                cash_mask=np.isin(symbols, _CASH_SYMBOLS)
+            )
+        return self._holdings_view
+
+    def _holding_values(self):
+        # Value per holding (in holdings order) when positions are known, otherwise quantity
+        if self.positions_df is None:
+            return self.holdings.to_numpy(np.float64)
+        data = self.holdings_data
+        return np.fromiter(
+            (data[s].get('Current Value', 0) if s in data else q for s, q in self.holdings.items()),
+            dtype=np.float64, count=len(self.holdings)
+        )
+
     def get_asset_allocation(self):
+        if self._allocation_cache is not None:
+            return self._allocation_cache
         if self.positions_df is None:
             return {}
             
@@ -284,41 +590,21 @@ class PortfolioAnalyzer:
         # Note: The CSV column might be 'Investment Type' or just inferred.
         # Based on file view: "Investment Type" column exists.
         if 'Investment Type' in self.positions_df.columns:
-            allocation = self.positions_df.groupby('Investment Type')['Current Value'].sum().to_dict()
-            return allocation
+            self._allocation_cache = self.positions_df.groupby('Investment Type')['Current Value'].sum().to_dict()
+            return self._allocation_cache
         return {}
 
     def get_factor_exposure(self):
-        factors = {
-            "Growth/Tech": ["NVDA", "QQQ", "ARKK", "SOFI", "HOOD", "NET", "ZETA", "ONTO", "AMZN", "GOOG", "MSFT", "AAPL", "TSM", "NBIS", "OSCR", "PYPL", "JD", "BABA", "BIDU", "REGN"],
-            "Market/Core": ["VOO", "SPY", "BRKB", "VUG", "VTI", "VXUS", "ALLW"],
-            "Income/Yield": ["JEPI", "JEPQ", "TLT", "EPD", "ET", "MPLX", "DKL", "PALL"],
-            "Defensive": ["COST", "UPS", "UNH"],
-            "Cash/Equivalents": ["SPAXX", "FDRXX"]
-        }
-        
-        exposure = {"Unclassified": 0}
-        for f in factors:
-            exposure[f] = 0
-            
-        # Use Value if available, otherwise Quantity
-        use_value = self.positions_df is not None
-        
-        for symbol, qty in self.holdings.items():
-            val = qty
-            if use_value and symbol in self.holdings_data:
-                val = self.holdings_data[symbol].get('Current Value', 0)
-                
-            found = False
-            for factor, symbols in factors.items():
-                if symbol in symbols:
-                    exposure[factor] += val
-                    found = True
-                    break
-            if not found:
-                exposure["Unclassified"] += val
-                
-        return {k: v for k, v in exposure.items() if v > 0}
+        if self._exposure_cache is not None:
+            return self._exposure_cache
+
+        # Sum holding values per factor id in one bincount (missing values count as 0, as in a groupby sum).
+        # Uses value if available, otherwise quantity (see _holding_values).
+        view = self._holdings_arrays()
+        exposure = np.bincount(view.factor_ids, weights=np.nan_to_num(view.values), minlength=len(_FACTOR_NAMES))
+
+        self._exposure_cache = {name: value for name, value in zip(_FACTOR_NAMES, exposure.tolist()) if value > 0}
+        return self._exposure_cache
 
     def generate_tweaks(self):
         tweaks = []
@@ -326,26 +612,21 @@ class PortfolioAnalyzer:
             tweaks.append("Consider diversifying your portfolio. You hold fewer than 5 positions.")
         
         # Concentration Risk (by Value if possible)
-        total_exposure = sum(self.get_factor_exposure().values())
+        exposures = self.get_factor_exposure()
+        total_exposure = sum(exposures.values())
         
         if total_exposure > 0:
-            # Sort by value/qty
-            sorted_holdings = []
-            for s, q in self.holdings.items():
-                val = q
-                if self.positions_df is not None and s in self.holdings_data:
-                    val = self.holdings_data[s].get('Current Value', 0)
-                sorted_holdings.append((s, val))
-            
-            sorted_holdings.sort(key=lambda x: x[1], reverse=True)
+            # Weights and the cash filter are computed on aligned arrays; only the alerts get sorted
+            view = self._holdings_arrays()
+            weights = view.values / total_exposure
+            alert = (weights > 0.15) & ~view.cash_mask
+            symbols, weights = view.symbols[alert], weights[alert]
+            order = np.argsort(-weights, kind='stable')
             
-            for symbol, val in sorted_holdings:
-                weight = val / total_exposure
-                if symbol not in ["SPAXX", "FDRXX"] and weight > 0.15:
-                    tweaks.append(f"Concentration Alert: {symbol} makes up {weight:.1%} of your portfolio value.")
+            for symbol, weight in zip(symbols[order], weights[order]):
+                tweaks.append(f"Concentration Alert: {symbol} makes up {weight:.1%} of your portfolio value.")
         
         # Factor tweaks
-        exposures = self.get_factor_exposure()
         if "Growth/Tech" in exposures and exposures["Growth/Tech"] > total_exposure * 0.5:
              tweaks.append("High exposure to Growth/Tech (>50%). Consider balancing with Defensive or Income assets.")
 
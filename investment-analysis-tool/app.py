@@ -1,17 +1,19 @@
 from flask import Flask, render_template, request, send_file, Response, jsonify
 import os
 import markdown
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from analysis import PortfolioAnalyzer
 from writer import render_letter
 import plaid_service
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Holdings and transactions are independent requests, so they are fetched side by side
+# (plaid_service caches the responses, so repeat reports skip the round-trips entirely)
+_plaid_pool = ThreadPoolExecutor(max_workers=4)
 
 @app.route('/', methods=['GET'])
 def index():
@@ -56,13 +58,13 @@ def analyze_plaid():
         if not access_token:
             return "Missing access token", 400
             
-        # Fetch data
-        holdings_response = plaid_service.get_holdings(access_token)
-        
-        # Fetch transactions for the last year
+        # Fetch holdings and the last year of transactions concurrently
         start_date = (datetime.now() - timedelta(days=365)).date()
         end_date = datetime.now().date()
-        transactions_response = plaid_service.get_transactions(access_token, start_date, end_date)
+        holdings_future = _plaid_pool.submit(plaid_service.get_holdings, access_token)
+        transactions_future = _plaid_pool.submit(plaid_service.get_transactions, access_token, start_date, end_date)
+        holdings_response = holdings_future.result()
+        transactions_response = transactions_future.result()
         
         # Analyze
         analyzer = PortfolioAnalyzer(None, None) # No files needed
@@ -87,15 +89,8 @@ def analyze_fidelity():
         return "No selected file", 400
         
     if history_file and positions_file:
-        # Save files temporarily
-        history_path = os.path.join(app.config['UPLOAD_FOLDER'], 'history.csv')
-        positions_path = os.path.join(app.config['UPLOAD_FOLDER'], 'positions.csv')
-        
-        history_file.save(history_path)
-        positions_file.save(positions_path)
-        
-        # Run Analysis
-        analyzer = PortfolioAnalyzer(history_path, positions_path)
+        # Parse the uploads straight from the request streams (no temp copy on disk)
+        analyzer = PortfolioAnalyzer(history_file.stream, positions_file.stream)
         if analyzer.load_data():
             return generate_report(analyzer)
         else:
@@ -114,12 +109,9 @@ def analyze_robinhood():
         return "No selected file", 400
         
     if rh_file:
-        rh_path = os.path.join(app.config['UPLOAD_FOLDER'], 'robinhood.csv')
-        rh_file.save(rh_path)
-        
         # Initialize analyzer with RH file as history, no separate positions file
         # We will need to tell the analyzer this is Robinhood data
-        analyzer = PortfolioAnalyzer(rh_path, None)
+        analyzer = PortfolioAnalyzer(rh_file.stream, None)
         # We'll add a specific method or flag for RH loading
         if analyzer.load_robinhood_data():
              return generate_report(analyzer)
@@ -128,6 +120,11 @@ def analyze_robinhood():
 
     return "Unknown error", 500
 
+@lru_cache(maxsize=64)
+def _render_html(letter_md):
+    # Same portfolio -> same letter, so repeat report views skip the (pure-Python) markdown parse
+    return markdown.markdown(letter_md)
+
 def generate_report(analyzer):
     holdings = analyzer.calculate_holdings()
     perf = analyzer.analyze_performance()
@@ -147,7 +144,7 @@ def generate_report(analyzer):
     }
     
     letter_md = render_letter(data)
-    letter_html = markdown.markdown(letter_md)
+    letter_html = _render_html(letter_md)
     
     return render_template('result.html', letter_html=letter_html, letter_md=letter_md)
 
@@ -3,6 +3,11 @@ import json
 import datetime
 from datetime import timedelta
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, (datetime.date, datetime.datetime)):
@@ -49,8 +54,13 @@ def main():
         }
 
         output_file = "plaid_test_data.json"
-        with open(output_file, "w") as f:
-            json.dump(data, f, cls=DateTimeEncoder, indent=2)
+        if orjson is not None:
+            # orjson encodes dates natively and writes bytes straight to the file
+            with open(output_file, "wb") as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(output_file, "w") as f:
+                json.dump(data, f, cls=DateTimeEncoder, indent=2)
         
         print(f"Successfully saved test data to {output_file}")
 
@@ -0,0 +1,16 @@
+# Picked up automatically by `gunicorn wsgi:app` when run from this directory
+import multiprocessing
+import os
+
+# Loopback by default like the dev server (the endpoints are unauthenticated and hand out Plaid
+# access tokens); deployments behind a proxy opt in to other interfaces with BIND
+bind = os.getenv('BIND', '127.0.0.1:5000')
+
+# Analysis is CPU-bound pandas work, so scale with processes rather than threads
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Import app (and pandas/numpy) once in the master; forked workers share those pages copy-on-write
+preload_app = True
+
+# Plaid fetches plus a large CSV parse can take a while
+timeout = 120
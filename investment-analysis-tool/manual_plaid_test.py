@@ -1,7 +1,7 @@
 import os
 import json
-import urllib.request
-import urllib.error
+import http.client
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,22 +18,50 @@ else:
 print(f"Using Environment: {ENV}")
 print(f"URL: {URL}")
 
+# One keep-alive HTTPS connection shared by every call, so only the first request pays the TLS handshake
+_connection = None
+
+def _drop_connection():
+    global _connection
+    if _connection is not None:
+        _connection.close()
+        _connection = None
+
+def _get_connection(fresh=False):
+    global _connection
+    if fresh:
+        _drop_connection()
+    if _connection is None:
+        _connection = http.client.HTTPSConnection(urlsplit(URL).netloc, timeout=30)
+    return _connection
+
 def make_request(endpoint, data):
-    url = f"{URL}{endpoint}"
     data['client_id'] = CLIENT_ID
     data['secret'] = SECRET
     
     json_data = json.dumps(data).encode('utf-8')
-    req = urllib.request.Request(url, data=json_data, headers={'Content-Type': 'application/json'})
     
     try:
-        with urllib.request.urlopen(req) as response:
-            return json.loads(response.read().decode('utf-8'))
-    except urllib.error.HTTPError as e:
-        print(f"HTTP Error: {e.code} {e.reason}")
-        print(e.read().decode('utf-8'))
-        return {}
+        for attempt in range(2):
+            conn = _get_connection(fresh=attempt > 0)
+            try:
+                conn.request('POST', endpoint, body=json_data, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                body = response.read().decode('utf-8')
+                break
+            except ConnectionError:
+                # Server dropped the idle keep-alive socket; reconnect once
+                if attempt:
+                    raise
+        if response.status >= 400:
+            print(f"HTTP Error: {response.status} {response.reason}")
+            print(body)
+            return {}
+        return json.loads(body)
     except Exception as e:
+        # A failed exchange (e.g. a timeout) can leave the connection mid-request, which would make
+        # every later call fail with CannotSendRequest; start the next call on a fresh socket
+        _drop_connection()
         print(f"Error: {e}")
         return {}
 
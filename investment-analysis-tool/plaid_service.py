@@ -1,25 +1,166 @@
 import os
+import json
+import asyncio
 import datetime
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+import numpy as np
 import plaid
+import urllib3
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 from plaid.api import plaid_api
 from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
 from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
 from plaid.model.investments_holdings_get_request import InvestmentsHoldingsGetRequest
 from plaid.model.transactions_get_request import TransactionsGetRequest
+from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
 from plaid.model.products import Products
 from plaid.model.country_code import CountryCode
 from plaid.model.sandbox_public_token_create_request import SandboxPublicTokenCreateRequest
 from plaid.model.sandbox_public_token_create_request_options import SandboxPublicTokenCreateRequestOptions
 from dotenv import load_dotenv
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import h2 # noqa: F401 -- lets httpx negotiate HTTP/2
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 load_dotenv()
 
 PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID')
 PLAID_SECRET = os.getenv('PLAID_SECRET')
 PLAID_ENV = os.getenv('PLAID_ENV', 'sandbox')
 
-def get_plaid_client():
+# Pooled keep-alive sockets for the shared client: enough slots for concurrent requests,
+# and TCP keepalive so idle pooled connections aren't silently dropped by middleboxes
+_POOL_MAXSIZE = 20
+_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, 'TCP_KEEPIDLE'):
+    _SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30))
+
+# Every call gets a (connect, read) timeout so a hung Plaid socket can't pin a worker.
+# Read endpoints retry rate limits and gateway errors with backoff (honouring Retry-After); read errors are
+# not retried. Calls that create or consume something (link token, single-use public token exchange) only
+# retry statuses that mean the request was not processed: a 502/504 may have been applied upstream.
+# The last error response still surfaces as ApiException.
+_REQUEST_TIMEOUT = (5, 30)
+_RETRIES = Retry(
+    total=3, read=0, backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504), allowed_methods=frozenset(['POST']),
+    raise_on_status=False
+)
+_NON_IDEMPOTENT_RETRIES = Retry(
+    total=3, read=0, backoff_factor=0.3,
+    status_forcelist=(429, 503), allowed_methods=frozenset(['POST']),
+    raise_on_status=False
+)
+
+# Request enums are validated on construction, so build the fixed ones once
+_PRODUCTS = [Products('investments'), Products('transactions')]
+_COUNTRY_CODES = [CountryCode('US')]
+
+# Response cache in front of the read endpoints. Holdings move within the day, a transaction window
+# barely changes, so each endpoint gets its own TTL. Expired entries are kept (up to _CACHE_MAX) so a
+# transient Plaid failure can still be answered with the last good response (stale-if-error), but
+# never one older than _MAX_STALE.
+_HOLDINGS_TTL = 900 # seconds
+_TRANSACTIONS_TTL = 3600
+_MAX_STALE = 24 * 3600
+_CACHE_MAX = 1024
+_response_cache = {} # key -> (fetched_at, response), oldest first
+_response_cache_lock = threading.Lock()
+
+def _is_transient(error):
+    # Outages and rate limits are worth papering over; 4xx errors (ITEM_LOGIN_REQUIRED, bad token, ...)
+    # need the user's attention and must reach the caller. Status 0 is the SDK wrapping an SSL failure.
+    if isinstance(error, urllib3.exceptions.HTTPError):
+        return True
+    status = getattr(error, 'status', None) or 0
+    return status in (0, 429) or status >= 500
+
+def _cached(key, ttl, fetch):
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+
+    try:
+        response = fetch()
+    except (plaid.ApiException, urllib3.exceptions.HTTPError) as e:
+        if entry is not None and _is_transient(e) and time.monotonic() - entry[0] < _MAX_STALE:
+            return entry[1]
+        raise
+
+    with _response_cache_lock:
+        _response_cache.pop(key, None)
+        while len(_response_cache) >= _CACHE_MAX:
+            del _response_cache[next(iter(_response_cache))]
+        _response_cache[key] = (time.monotonic(), response)
+    return response
+
+def _json_body(response):
+    # Read endpoints are called with _preload_content=False and the raw JSON is decoded once here,
+    # skipping the SDK's model deserialization and the recursive to_dict() copy on top of it.
+    # Dates therefore stay ISO strings.
+    return orjson.loads(response.data) if orjson is not None else json.loads(response.data)
+
+# Link tokens are valid for 4 hours, so one per user is reused until shortly before it expires
+_LINK_TOKEN_TTL = 3.5 * 3600 # seconds, upper bound
+_LINK_TOKEN_MARGIN = 60
+_link_tokens = {} # user_id -> (expires_at, link_token), oldest first
+
+# Largest page /transactions/get will return
+_TRANSACTIONS_PAGE_SIZE = 500
+
+# Reads on the shared client are capped at one in flight per pooled socket, however many callers fan out
+# (bulk helpers x pages), so urllib3 never opens throwaway overflow connections. Extra transaction pages
+# run on one shared pool instead of a new executor per call.
+_read_slots = threading.BoundedSemaphore(_POOL_MAXSIZE)
+_page_pool = ThreadPoolExecutor(max_workers=_POOL_MAXSIZE)
+
+# Concurrent identical calls are coalesced: the first caller runs the request, the rest wait on its result
+_inflight = {} # key -> Future
+_inflight_lock = threading.Lock()
+
+def _single_flight(key, fn):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if leader:
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            # Includes KeyboardInterrupt/SystemExit so waiters are always released
+            future.set_exception(e)
+        finally:
+            with _inflight_lock:
+                del _inflight[key]
+    return future.result()
+
+# Built once and shared: the PlaidApi instance owns the urllib3 pool, so reusing it keeps connections alive.
+# Non-idempotent calls use a second client that differs only in its retry policy.
+@lru_cache(maxsize=2)
+def get_plaid_client(idempotent=True):
     if PLAID_ENV == 'sandbox':
         host = plaid.Environment.Sandbox
     elif PLAID_ENV == 'development':
@@ -40,58 +181,292 @@ def get_plaid_client():
         }
         # verify_ssl=False # Uncomment if SSL issues suspected
     )
+    configuration.connection_pool_maxsize = _POOL_MAXSIZE
+    configuration.socket_options = _SOCKET_OPTIONS
+    configuration.retries = _RETRIES if idempotent else _NON_IDEMPOTENT_RETRIES
     api_client = plaid.ApiClient(configuration)
+    # JSON compresses several-fold; urllib3 inflates it transparently when the body is read
+    api_client.set_default_header('Accept-Encoding', 'gzip')
     return plaid_api.PlaidApi(api_client)
 
 def create_link_token(user_id):
-    client = get_plaid_client()
+    link_token = _cached_link_token(user_id)
+    if link_token is not None:
+        return link_token
+    # A burst of mounts for the same user shares one mint
+    return _single_flight(('link_token', user_id), lambda: _refresh_link_token(user_id))
+
+def _cached_link_token(user_id):
+    with _response_cache_lock:
+        entry = _link_tokens.get(user_id)
+    if entry is not None and time.monotonic() < entry[0]:
+        return entry[1]
+    return None
+
+def _refresh_link_token(user_id):
+    # A caller that missed the cache just before the previous flight stored its token lands here
+    # after that flight is gone; reuse the token instead of minting a second one
+    link_token = _cached_link_token(user_id)
+    if link_token is not None:
+        return link_token
+    link_token, ttl = _mint_link_token(user_id)
+    with _response_cache_lock:
+        _link_tokens.pop(user_id, None)
+        while len(_link_tokens) >= _CACHE_MAX:
+            del _link_tokens[next(iter(_link_tokens))]
+        _link_tokens[user_id] = (time.monotonic() + ttl, link_token)
+    return link_token
+
+def _mint_link_token(user_id):
+    # Returns the new token and how long it may be reused (its expiration less a safety margin)
+    client = get_plaid_client(idempotent=False)
     request = LinkTokenCreateRequest(
-        products=[Products('investments'), Products('transactions')],
+        products=_PRODUCTS,
         client_name="Investment Analyzer",
-        country_codes=[CountryCode('US')],
+        country_codes=_COUNTRY_CODES,
         language='en',
         user=LinkTokenCreateRequestUser(
             client_user_id=user_id
         )
     )
-    response = client.link_token_create(request)
-    return response['link_token']
+    response = client.link_token_create(request, _request_timeout=_REQUEST_TIMEOUT)
+    remaining = (response['expiration'] - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+    return response['link_token'], min(_LINK_TOKEN_TTL, remaining - _LINK_TOKEN_MARGIN)
 
 def exchange_public_token(public_token):
-    client = get_plaid_client()
+    client = get_plaid_client(idempotent=False)
     request = ItemPublicTokenExchangeRequest(
         public_token=public_token
     )
-    response = client.item_public_token_exchange(request)
+    response = client.item_public_token_exchange(request, _request_timeout=_REQUEST_TIMEOUT)
     return response['access_token']
 
 def get_holdings(access_token):
+    return _cached(('holdings', access_token), _HOLDINGS_TTL, lambda: _fetch_holdings(access_token))
+
+def get_transactions(access_token, start_date, end_date):
+    return _cached(
+        ('transactions', access_token, start_date, end_date), _TRANSACTIONS_TTL,
+        lambda: _fetch_transactions(access_token, start_date, end_date)
+    )
+
+# Slim views: only the fields the analyzer reads, pulled out with C-level itemgetters
+# instead of walking every key of every record
+_HOLDING_FIELDS = ('security_id', 'quantity', 'institution_price', 'institution_value', 'cost_basis')
+_SECURITY_FIELDS = ('ticker_symbol', 'type')
+_TRANSACTION_FIELDS = ('date', 'amount', 'name')
+_extract_holding = itemgetter(*_HOLDING_FIELDS)
+_extract_security = itemgetter(*_SECURITY_FIELDS)
+_extract_transaction = itemgetter(*_TRANSACTION_FIELDS)
+
+def get_holdings_slim(access_token):
+    # -> ([(security_id, quantity, institution_price, institution_value, cost_basis), ...],
+    #     {security_id: (ticker_symbol, type)})
+    response = get_holdings(access_token)
+    holdings = list(map(_extract_holding, response['holdings']))
+    securities = {security['security_id']: _extract_security(security) for security in response['securities']}
+    return holdings, securities
+
+# Columnar holdings for vectorized analytics (e.g. holdings['quantity'] * holdings['institution_price']).
+# security_id stays an object field: Plaid ids are longer than a fixed-width string would safely hold.
+_HOLDING_DTYPE = np.dtype([
+    ('security_id', object),
+    ('quantity', np.float64),
+    ('institution_price', np.float64),
+    ('institution_value', np.float64),
+    ('cost_basis', np.float64), # null -> NaN
+])
+
+def get_holdings_array(access_token):
+    # -> (structured array with _HOLDING_DTYPE fields, {security_id: (ticker_symbol, type)})
+    holdings, securities = get_holdings_slim(access_token)
+    return np.array(holdings, dtype=_HOLDING_DTYPE), securities
+
+def get_transactions_slim(access_token, start_date, end_date):
+    # -> [(date, amount, name), ...]
+    response = get_transactions(access_token, start_date, end_date)
+    return list(map(_extract_transaction, response['transactions']))
+
+def _fetch_holdings(access_token):
     client = get_plaid_client()
     request = InvestmentsHoldingsGetRequest(
         access_token=access_token
     )
-    response = client.investments_holdings_get(request)
-    return response.to_dict()
+    with _read_slots:
+        return _json_body(client.investments_holdings_get(request, _preload_content=False, _request_timeout=_REQUEST_TIMEOUT))
 
-def get_transactions(access_token, start_date, end_date):
+def _fetch_transactions(access_token, start_date, end_date):
+    # The first page reports total_transactions; the remaining pages are fetched concurrently
+    # and appended in offset order, so callers get the whole window in one response
+    response = _fetch_transactions_page(access_token, start_date, end_date, 0)
+    offsets = range(_TRANSACTIONS_PAGE_SIZE, response.get('total_transactions', 0), _TRANSACTIONS_PAGE_SIZE)
+    pages = _page_pool.map(lambda offset: _fetch_transactions_page(access_token, start_date, end_date, offset), offsets)
+    for page in pages:
+        response['transactions'].extend(page['transactions'])
+    return response
+
+def _fetch_transactions_page(access_token, start_date, end_date, offset):
     client = get_plaid_client()
     request = TransactionsGetRequest(
         access_token=access_token,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        options=TransactionsGetRequestOptions(count=_TRANSACTIONS_PAGE_SIZE, offset=offset)
     )
-    response = client.transactions_get(request)
-    return response.to_dict()
+    with _read_slots:
+        return _json_body(client.transactions_get(request, _preload_content=False, _request_timeout=_REQUEST_TIMEOUT))
 
-def create_sandbox_public_token(institution_id='ins_109508', initial_products=[Products('investments'), Products('transactions')], override_username='user_good', override_password='pass_good'):
+def sync_transactions(access_token, cursor=None):
+    # Incremental alternative to get_transactions: /transactions/sync returns only what changed since
+    # `cursor` (None = full initial sync). Store the returned cursor per item and pass it next time.
     client = get_plaid_client()
+    added, modified, removed = [], [], []
+    has_more = True
+    while has_more:
+        request = TransactionsSyncRequest(
+            access_token=access_token,
+            cursor=cursor or '',
+            count=_TRANSACTIONS_PAGE_SIZE
+        )
+        with _read_slots:
+            response = _json_body(client.transactions_sync(request, _preload_content=False, _request_timeout=_REQUEST_TIMEOUT))
+        added.extend(response['added'])
+        modified.extend(response['modified'])
+        removed.extend(response['removed'])
+        has_more = response['has_more']
+        cursor = response['next_cursor']
+    return added, modified, removed, cursor
+
+def _fan_out(fetch, access_tokens, *args):
+    # One request per linked item, run concurrently on the shared client (its pool holds _POOL_MAXSIZE sockets).
+    # Results come back in the same order as access_tokens; the first failure is re-raised.
+    access_tokens = list(access_tokens)
+    if not access_tokens:
+        return []
+    with ThreadPoolExecutor(max_workers=min(_POOL_MAXSIZE, len(access_tokens))) as pool:
+        return list(pool.map(lambda token: fetch(token, *args), access_tokens))
+
+def get_holdings_bulk(access_tokens):
+    return _fan_out(get_holdings, access_tokens)
+
+def get_transactions_bulk(access_tokens, start_date, end_date):
+    return _fan_out(get_transactions, access_tokens, start_date, end_date)
+
+def create_sandbox_public_token(institution_id='ins_109508', initial_products=None, override_username='user_good', override_password='pass_good'):
+    client = get_plaid_client(idempotent=False)
     request = SandboxPublicTokenCreateRequest(
         institution_id=institution_id,
-        initial_products=initial_products,
+        initial_products=initial_products or _PRODUCTS,
         options=SandboxPublicTokenCreateRequestOptions(
             override_username=override_username,
             override_password=override_password
         )
     )
-    response = client.sandbox_public_token_create(request)
+    response = client.sandbox_public_token_create(request, _request_timeout=_REQUEST_TIMEOUT)
     return response['public_token']
+
+# Async variants talk to Plaid's REST API directly through a pooled httpx.AsyncClient,
+# so many items can be fetched from a single event loop.
+_PLAID_URLS = {
+    'sandbox': 'https://sandbox.plaid.com',
+    'development': 'https://development.plaid.com',
+    'production': 'https://production.plaid.com',
+}
+# One client per event loop: pooled connections are bound to the loop that opened them, so a client
+# reused from an earlier asyncio.run would fail with "Event loop is closed"
+_async_clients = {}
+
+def _get_async_client():
+    if httpx is None:
+        raise ImportError("httpx is required for the async Plaid helpers (pip install httpx).")
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # Clients of loops that shut down without aclose() can no longer be used; just let them go
+        for other in list(_async_clients):
+            if other.is_closed():
+                _async_clients.pop(other, None)
+        client = _async_clients[loop] = httpx.AsyncClient(
+            base_url=_PLAID_URLS.get(PLAID_ENV, _PLAID_URLS['sandbox']),
+            http2=_HTTP2,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+    return client
+
+async def aclose():
+    # Closes the current event loop's client; call before the loop shuts down
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def _apost(endpoint, body):
+    if not PLAID_CLIENT_ID or not PLAID_SECRET:
+        raise ValueError("PLAID_CLIENT_ID and PLAID_SECRET must be set in the environment variables.")
+    response = await _get_async_client().post(endpoint, json={'client_id': PLAID_CLIENT_ID, 'secret': PLAID_SECRET, **body})
+    response.raise_for_status()
+    return response.json()
+
+async def acreate_link_token(user_id):
+    response = await _apost('/link/token/create', {
+        'products': ['investments', 'transactions'],
+        'client_name': "Investment Analyzer",
+        'country_codes': ['US'],
+        'language': 'en',
+        'user': {'client_user_id': user_id}
+    })
+    return response['link_token']
+
+async def aget_holdings(access_token):
+    return await _apost('/investments/holdings/get', {'access_token': access_token})
+
+async def aget_transactions(access_token, start_date, end_date):
+    # Same pagination as _fetch_transactions: the first page reports total_transactions,
+    # the remaining offsets are gathered concurrently and appended in offset order
+    response = await _aget_transactions_page(access_token, start_date, end_date, 0)
+    offsets = range(_TRANSACTIONS_PAGE_SIZE, response.get('total_transactions', 0), _TRANSACTIONS_PAGE_SIZE)
+    pages = await asyncio.gather(*(_aget_transactions_page(access_token, start_date, end_date, offset) for offset in offsets))
+    for page in pages:
+        response['transactions'].extend(page['transactions'])
+    return response
+
+async def _aget_transactions_page(access_token, start_date, end_date, offset):
+    return await _apost('/transactions/get', {
+        'access_token': access_token,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'options': {'count': _TRANSACTIONS_PAGE_SIZE, 'offset': offset}
+    })
+
+async def aget_holdings_bulk(access_tokens):
+    return await asyncio.gather(*(aget_holdings(token) for token in access_tokens))
+
+async def aget_transactions_bulk(access_tokens, start_date, end_date):
+    return await asyncio.gather(*(aget_transactions(token, start_date, end_date) for token in access_tokens))
+
+# Bounded-concurrency crawl over many items: each item's holdings and every transactions page are fetched
+# together, at most _FETCH_ALL_CONCURRENCY items at a time (each item holds its slot until all pages are in)
+_FETCH_ALL_CONCURRENCY = 20
+
+async def afetch_all(access_tokens, start_date, end_date):
+    semaphore = asyncio.Semaphore(_FETCH_ALL_CONCURRENCY)
+
+    async def fetch_item(access_token):
+        async with semaphore:
+            holdings, transactions = await asyncio.gather(
+                aget_holdings(access_token),
+                aget_transactions(access_token, start_date, end_date)
+            )
+        return {'holdings': holdings, 'transactions': transactions}
+
+    return await asyncio.gather(*(fetch_item(token) for token in access_tokens))
+
+def fetch_all(access_tokens, start_date, end_date):
+    # Blocking entry point for scripts/scheduled jobs. The async client is tied to the event loop,
+    # so it is closed before asyncio.run tears that loop down.
+    async def run():
+        try:
+            return await afetch_all(access_tokens, start_date, end_date)
+        finally:
+            await aclose()
+    return asyncio.run(run())
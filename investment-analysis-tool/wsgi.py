@@ -0,0 +1,4 @@
+# Production entry point. Run from this directory with:
+#   gunicorn wsgi:app
+# Worker count and preloading come from gunicorn.conf.py; `python app.py` stays the dev server.
+from app import app